@@ -48,7 +48,7 @@ except ComputeTargetException:
         # Define VM size and max number of nodes for scaling
         compute_config = AmlCompute.provisioning_configuration( # Create a configuration object for provisioning an AmlCompute target
             vm_size='STANDARD_DS11_V2',                         # Size of agent VMs
-            max_nodes=2                                         # Maximum number of nodes to use on the cluster, defaults to 4
+            max_nodes=3                                         # Maximum number of nodes to use on the cluster, defaults to 4, allows the parallel pipeline steps of ./06_pipeline.py to run concurrently
         )
         training_cluster = ComputeTarget.create(                # Provision new Compute object by specifying a compute type and related configuration               
             ws,                                                 # Workspace object to create the Compute object under
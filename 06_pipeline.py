@@ -1,14 +1,23 @@
 # Import libraries
 from azureml.core import Environment, Experiment, Model, Workspace
-from azureml.core.authentication import InteractiveLoginAuthentication
+from azureml.core.authentication import InteractiveLoginAuthentication, ServicePrincipalAuthentication
 from azureml.core.runconfig import RunConfiguration
 from azureml.data import OutputFileDatasetConfig
-from azureml.pipeline.core import Pipeline, ScheduleRecurrence, Schedule
+from azureml.data.datapath import DataPath, DataPathComputeBinding
+from azureml.pipeline.core import Pipeline, PipelineParameter, ScheduleRecurrence, Schedule
 from azureml.pipeline.core.run import PipelineRun
 from azureml.pipeline.steps import PythonScriptStep
 from azureml.widgets import RunDetails
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import functools
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
+
+load_dotenv()
 
 #-----WORKSPACE----------------------------------------------------------------#
 # Load workspace from config JSON file
@@ -16,8 +25,29 @@ ws = Workspace.from_config()                                    # Returns a work
 print(ws.name, 'loaded')
 
 #-----DATASET------------------------------------------------------------------#
-# Get the training dataset from registered datasets (see ./01_datastores.py)
-diabetes_ds = ws.datasets.get('diabetes dataset')               # Get specified dataset from list of all datasets in workspace
+# Get the training data path on the default datastore (see ./01_datastores.py)
+'''
+Data path as pipeline parameter
+* Pass the raw training data as a DataPath pipeline parameter instead of a registered dataset
+    * Default value points to the training data folder on the datastore
+    * Each run can set another path, e.g. the datastore trigger sets the path of added or modified blobs (see SCHEDULE)
+* Reuse of the prep steps is decided on the path, not on the content of the blobs:
+    * Manual runs on the default path reuse previous results
+    * Triggered runs get the changed path as input and therefore re-run
+* Data paths can be mounted or downloaded
+    * Mount: files are read over the network on access
+    * Download: files are copied to the local disk of the compute once, before the script starts
+    * Prefer download if the step reads all files anyway, as the data preparation does
+'''
+training_data_path = DataPath(                                  # Represents a path to data in a datastore
+    datastore=ws.get_default_datastore(),                       # Datastore the path is on
+    path_on_datastore='diabetes-data/'                          # Relative path on the datastore
+)
+raw_data_param = PipelineParameter(                             # Defines a parameter in a pipeline execution, can be set per run
+    name='input_data',                                          # Name of the pipeline parameter
+    default_value=training_data_path                            # Value used if the run does not set the parameter
+)
+raw_data = (raw_data_param, DataPathComputeBinding(mode='download'))  # Download the data of the path to the compute
 
 #-----COMPUTE_TARGET-----------------------------------------------------------#
 # Define compute target (see ./02_compute.py)
@@ -27,6 +57,17 @@ cluster_name = 'ml-sdk-cc'
 # Get the registered environment (see ./03_envs.py)
 registered_env = Environment.get(ws, 'experiment_env')          # Get specified environment object from workspace
 
+'''
+Environment image
+* Azure ML builds a Docker image for the environment and caches it in the container registry of the workspace
+* Environment is managed by Azure ML (see ./03_envs.py), unchanged environment versions reuse the cached image
+* Build the image once ahead of submission instead of within the first pipeline run
+'''
+image_details = registered_env.get_image_details(ws)           # Return the image details of the environment
+if not image_details['imageExistsInRegistry']:                  # Only build if no cached image exists yet
+    env_build = registered_env.build(ws)                        # Build a Docker image for the environment in the cloud
+    env_build.wait_for_completion(show_output=True)             # Wait for the completion of the image build
+
 #-----PIPELINE_SETUP-----------------------------------------------------------#
 '''
 Azure ML Pipelines
@@ -34,12 +75,15 @@ Azure ML Pipelines
 * Can be Python scripts, or specialized steps like a data transfer step copying data from one location to another
 * Each step can run in its own compute context
 
-This repo defines a simple pipeline containing two Python script steps:
-* First step to pre-process training data
-* Second step to use the pre-processed data to train a model
-* Reuse is enabled:
-    * Usually first step should run every time if the data has changed
-    * Subsequent steps are triggered only if the output from step one changes
+This repo defines a pipeline containing four Python script steps:
+* Three independent steps to pre-process training data (features, labels and summary statistics)
+* Final step to use the pre-processed data to train a model
+* Pipeline is a graph rather than a sequence of steps:
+    * Dependencies between steps are inferred from their inputs and outputs
+    * Steps without dependencies between each other run concurrently, if the compute target provides enough nodes
+* Reuse:
+    * Prep steps reuse previous results for an unchanged data path, changed data is passed in as a new path
+    * Training step is triggered only if the prep steps re-run and produce new outputs
     * For convenience reuse enables to only run any steps with changed parameter
 
 * Common step types in an Azure ML pipeline:
@@ -55,33 +99,45 @@ pipeline_run_config.target = cluster_name                       # Set compute ta
 pipeline_run_config.environment = registered_env                # Environment definition: assign the environment to the run configuration
 print ('Run configuration created.')
 
-# Create an OutputFileDatasetConfig (temporary Data Reference) for data passed from step 1 to step 2
-prepped_data = OutputFileDatasetConfig('prepped_data')          # Represent how to copy the output of a run and be promoted as a FileDataset
+# Create an OutputFileDatasetConfig (temporary Data Reference) for each data passed from the prep steps to the training step
+# Prep steps write parquet files, uploaded to the datastore once the step is completed
+prepped_features = OutputFileDatasetConfig('prepped_features').as_upload(overwrite=True)  # Represent how to copy the output of a run and be promoted as a FileDataset
+prepped_labels = OutputFileDatasetConfig('prepped_labels').as_upload(overwrite=True)
+data_stats = OutputFileDatasetConfig('data_stats').as_upload(overwrite=True)
 
 # Review ./experiments/* which includes example pipeline steps
 experiment_folder = './experiments'                             # Experiment script folder
 
-# Step 1, Run the data prep script
-prep_step = PythonScriptStep(
-    name = 'Prepare Data',                                      # Name of the step
-    source_directory = experiment_folder,                       # Folder that contains Python script, conda env, and other resources used in the step
-    script_name = '06_data_prep.py',                            # Name of a Python script relative to source_directory
-    arguments = [                                               # Command line arguments for the Python script file, arguments will be passed to compute via arguments parameter in RunConfiguration 
-        '--input-data', diabetes_ds.as_named_input('raw_data'), # Reference to tabular dataset
-        '--prepped-data', prepped_data                          # Reference to output data
-    ],                                                          
-    compute_target = cluster_name,                              # Compute target to use
-    runconfig = pipeline_run_config,                            # RunConfiguration to specify additional requirements for run, such as conda dependencies and a docker image
-    allow_reuse = True                                          # Indicates whether the step should reuse previous results when re-run with the same settings
-)
-
-# Step 2, run the training script
+# Step 1, run the data prep script for each part of the training data
+def create_prep_step(name, prep_task, prepped_data):
+    return PythonScriptStep(
+        name = name,                                            # Name of the step
+        source_directory = experiment_folder,                   # Folder that contains Python script, conda env, and other resources used in the step
+        script_name = '06_data_prep.py',                        # Name of a Python script relative to source_directory
+        arguments = [                                           # Command line arguments for the Python script file, arguments will be passed to compute via arguments parameter in RunConfiguration 
+            '--input-data', raw_data,                           # Reference to raw data path, downloaded to the compute
+            '--prep-task', prep_task,                           # Part of the data preparation to run
+            '--prepped-data', prepped_data                      # Reference to output data
+        ],                                                      
+        inputs = [raw_data],                                    # List of input port bindings, data path parameters have to be listed as inputs
+        compute_target = cluster_name,                          # Compute target to use
+        runconfig = pipeline_run_config,                        # RunConfiguration to specify additional requirements for run, such as conda dependencies and a docker image
+        allow_reuse = True                                      # Indicates whether the step should reuse previous results when re-run with the same settings
+    )
+
+prep_features_step = create_prep_step('Prepare Features', 'features', prepped_features)
+prep_labels_step = create_prep_step('Prepare Labels', 'labels', prepped_labels)
+compute_stats_step = create_prep_step('Compute Statistics', 'stats', data_stats)
+
+# Step 2, run the training script once all prep steps are completed
 train_step = PythonScriptStep(
     name = 'Train and Register Model',                          # Name of the step
     source_directory = experiment_folder,                       # Folder that contains Python script, conda env, and other resources used in the step
     script_name = '06_train_model.py',                          # Name of a Python script relative to source_directory
     arguments = [                                               # Command line arguments for the Python script file, arguments will be passed to compute via arguments parameter in RunConfiguration 
-        '--training-data', prepped_data.as_input(),             # Reference to step 1 output data
+        '--training-features', prepped_features.as_input(),     # Reference to step 1 output data
+        '--training-labels', prepped_labels.as_input(),         # Reference to step 1 output data
+        '--data-stats', data_stats.as_input(),                  # Reference to step 1 output data
         '--regularization', 0.1                                 # Regularizaton rate parameter
     ],                                                          
     compute_target = cluster_name,                              # Compute target to use
@@ -89,10 +145,44 @@ train_step = PythonScriptStep(
     allow_reuse = True                                          # Indicates whether the step should reuse previous results when re-run with the same settings
 )
 
+'''
+Distributed training
+* A PythonScriptStep runs its script on a single node of the compute target, regardless of the cluster size
+* Use MPI to launch the script on multiple nodes for data parallel training
+    * node_count: number of nodes to use for the step
+    * process_count_per_node: number of processes per node, usually the number of GPUs per node
+* Training script needs to use a distributed training framework to synchronize the processes
+    * e.g. PyTorch: torch.distributed.init_process_group(backend='nccl') with a DistributedDataParallel model
+    * Shard the training data with a DistributedSampler per process rank
+    * torch.nn.DataParallel only uses the GPUs of a single node
+* Only worth it for compute bound models on a GPU cluster, the logistic regression of this repo trains on a single node
+* Placeholders below: neither the GPU cluster 'ml-sdk-gpu-cc' nor the script 'distributed_train_model.py' exist in this repo
+'''
+# from azureml.core.runconfig import MpiConfiguration
+# distributed_run_config = RunConfiguration()                   # Represents configuration for experiment runs targeting different compute targets in Azure ML
+# distributed_run_config.target = 'ml-sdk-gpu-cc'               # Set GPU compute target where job is scheduled for execution
+# distributed_run_config.environment = registered_env           # Environment definition incl. distributed training framework e.g. PyTorch
+# distributed_run_config.communicator = 'IntelMpi'              # Communicator used to launch the distributed processes
+# distributed_run_config.mpi = MpiConfiguration(                # Configuration for a distributed job using MPI
+    # node_count=4,                                             # Number of nodes to use for the job
+    # process_count_per_node=4                                  # Number of processes per node
+# )
+# distributed_run_config.node_count = 4                         # Number of nodes to use for the job
+
+# train_step = PythonScriptStep(
+    # name = 'Distributed Train and Register Model',            # Name of the step
+    # source_directory = experiment_folder,                     # Folder that contains Python script, conda env, and other resources used in the step
+    # script_name = 'distributed_train_model.py',               # Training script using DistributedDataParallel
+    # arguments = [...],                                        # Same arguments as the single node training step
+    # compute_target = 'ml-sdk-gpu-cc',                         # Compute target to use
+    # runconfig = distributed_run_config,                       # RunConfiguration incl. the MPI configuration
+    # allow_reuse = True                                        # Indicates whether the step should reuse previous results when re-run with the same settings
+# )
+
 print('Pipeline steps defined')
 
 # Construct the pipeline
-pipeline_steps = [prep_step, train_step]
+pipeline_steps = [prep_features_step, prep_labels_step, compute_stats_step, train_step]  # Execution order is derived from data dependencies
 pipeline = Pipeline(                                            # Create and manage workflows that stitch together various machine learning phases
     workspace=ws,                                               # Workspace to submit the Pipeline on
     steps=pipeline_steps                                        # List of steps to execute as part of a Pipeline
@@ -110,18 +200,76 @@ experiment = Experiment(                                        # Main entry poi
 #-----RUN----------------------------------------------------------------------#
 '''
 Run object is a reference to an individual run of an experiment in Azure ML
+* Steps with allow_reuse=True are skipped if their script folder, arguments and inputs are unchanged since a previous run
+    * Data inputs count as unchanged as long as their path is unchanged, even if blobs were added or modified
+    * Runs on the default input_data path reuse the prep steps and hence the training step
+* Keep source_directory stable, any changed file in it triggers a re-run of its steps
+* Set no_cache to True to force all steps to run again, e.g. when blobs on the default input_data path changed since the last run
 '''
+no_cache = False                                                # Regenerate all step outputs instead of reusing previous results for an unchanged data path
+
 # Submit an experiment incl config to be submitted and return the active created run
 pipeline_run = experiment.submit(                               # Run defines the base class for all Azure Machine Learning experiment runs
     pipeline,                                                   # Config to be submitted
-    regenerate_outputs=True                                     # Whether to force regeneration of all step outputs and disallow data reuse for run, default is False
+    regenerate_outputs=no_cache                                 # Whether to force regeneration of all step outputs and disallow data reuse for run, default is False
 )                                   
 print('Pipeline submitted for execution.')
 
 # In Jupyter Notebooks, use RunDetails widget to see a visualization of the run details
 # RunDetails(pipeline_run).show()
 
-pipeline_run.wait_for_completion()                              # Wait for the completion of this run, returns the status object after the wait
+'''
+Waiting for the run blocks the script for the entire run duration
+* Wait in a background thread instead
+* Meanwhile, prepare anything not depending on the run results e.g. download folders and authentication
+* Cancel the run if this preparation fails, to fail fast instead of waiting for the run to complete
+'''
+log_folder = 'downloaded-logs'
+download_folder = 'downloaded-files'
+
+'''
+Authentication for the REST endpoint
+* Use a service principal if all of its credentials are set in .env (see ./template.env), otherwise fall back to interactive login
+* Tokens are valid for about an hour, cache the authorization header instead of acquiring a new token per REST call
+'''
+sp_tenant_id = os.getenv('AZURE-TENANT-ID')
+sp_client_id = os.getenv('AZURE-CLIENT-ID')
+sp_client_secret = os.getenv('AZURE-CLIENT-SECRET')
+if sp_tenant_id and sp_client_id and sp_client_secret:
+    auth = ServicePrincipalAuthentication(                      # Manages authentication using a service principal instead of a user identity
+        tenant_id=sp_tenant_id,                                 # Active Directory tenant that the service identity belongs to
+        service_principal_id=sp_client_id,                      # Service principal ID
+        service_principal_password=sp_client_secret             # Service principal password/key
+    )
+else:
+    auth = InteractiveLoginAuthentication()                     # Manages authentication and acquires an authorization token in interactive login workflows
+auth_header_ttl = 3000                                          # Seconds to reuse a cached authorization header, shorter than the token lifetime
+
+@functools.lru_cache(maxsize=1)
+def cached_auth_header(ttl_bucket):
+    return auth.get_authentication_header()                     # Return the HTTP authorization header, authorization header contains the user access token for access authorization against the service
+
+def get_auth_header():
+    # New cache key once per TTL period, i.e. the header is refreshed after auth_header_ttl seconds
+    return cached_auth_header(int(time.time() // auth_header_ttl))
+
+with ThreadPoolExecutor(max_workers=1) as executor:
+    run_completion = executor.submit(pipeline_run.wait_for_completion)  # Wait for the completion of this run in a worker thread
+
+    try:
+        # Create download folders
+        os.makedirs(log_folder, exist_ok=True)
+        os.makedirs(download_folder, exist_ok=True)
+
+        # Acquire and cache authentication header, used for the REST endpoint (see below)
+        get_auth_header()
+        print('Authentication header ready.')
+    except Exception:
+        # Cancel the run on setup errors, otherwise the error is only raised once the wait for the run completes
+        pipeline_run.cancel()                                   # Mark the run for cancellation, the wait in the worker thread returns shortly after
+        raise
+
+    run_completion.result()                                     # Returns the status object after the wait, re-raises any error of the wait
 
 #-----LOGS---------------------------------------------------------------------#
 # Review metrics for each step
@@ -140,32 +288,50 @@ Troubleshoot the experiment run
 run_details = pipeline_run.get_details_with_logs()              # Return run status including log file content
 print(f'Run details: \n\t{run_details}')
 
-# Download log files
-log_folder = 'downloaded-logs'
-pipeline_run.get_all_logs(destination=log_folder)               # Download all logs for the run to a directory
-# Verify the files have been downloaded
-for root, directories, filenames in os.walk(log_folder): 
-    for filename in filenames:  
-        print (os.path.join(root,filename))
-
 '''
-Download the files produced by the experiment e.g. for logged visualizations
+Download log files and files produced by the experiment e.g. for logged visualizations
 * Either individually by using the download_file method
 * Or by using the download_files method to retrieve multiple files
+* Downloads are bound by storage round-trips rather than compute
+    * Issue them concurrently from a thread pool to overlap the round-trips
+    * Fan out single download_file calls to download multiple outputs in parallel
 '''
-# Download 
-download_folder = 'downloaded-files'
-
-# Download files in the 'outputs' folder
-pipeline_run.download_files(                                    # Download files from a given storage prefix (folder name) or entire container if prefix is unspecified
-    prefix='outputs',                                           # Filepath prefix within container from which to download all artifacts
-    output_directory=download_folder                            # Optional directory that all artifact paths use as a prefix
-)
+download_max_workers = 16                                       # Number of concurrent downloads, tune to available bandwidth
+
+with ThreadPoolExecutor(max_workers=download_max_workers) as executor:
+    download_futures = [
+        executor.submit(                                        # Schedule download of all logs to be executed in a worker thread
+            pipeline_run.get_all_logs,                          # Download all logs for the run to a directory
+            destination=log_folder                              # Path to store the logs
+        )
+    ]
+    for file_name in pipeline_run.get_file_names():             # List the files that are stored in association with the run
+        if not file_name.startswith('outputs/'):                # Only download files in the 'outputs' folder
+            continue
+        output_file_path = os.path.join(download_folder, file_name)
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        download_futures.append(executor.submit(
+            pipeline_run.download_file,                         # Download an associated file from storage
+            name=file_name,                                     # Name of the artifact to be downloaded
+            output_file_path=output_file_path                   # Local path where to store the artifact
+        ))
+    # Wait for all downloads to finish, re-raising any download error
+    for future in download_futures:
+        future.result()
 
 # Verify the files have been downloaded
-for root, directories, filenames in os.walk(download_folder): 
-    for filename in filenames:  
-        print (os.path.join(root,filename))
+def iter_files(folder):
+    # Yield file paths lazily, file type of directory entries is known without additional stat calls
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                yield entry.path
+            elif entry.is_dir(follow_symlinks=False):
+                yield from iter_files(entry.path)
+
+for folder in [log_folder, download_folder]:
+    for file_path in iter_files(folder):
+        print(file_path)
 
 #-----REGISTER_MODEL-----------------------------------------------------------#
 '''
@@ -174,26 +340,29 @@ Register run machine learning model
 * Register model in your Azure ML workspace
 * Allowing to track model versions and retrieve them later
 '''
+pipeline_metrics = pipeline_run.get_metrics()                   # Retrieve the metrics logged to the run once, instead of for each property
 pipeline_run.register_model(                                    # Register a model for operationalization
     model_path='outputs/diabetes_model.pkl',                    # Relative cloud path to model
     model_name='diabetes_model',                                # Name of model
     tags={'Training context':'Script'},                         # Dictionary of key value tags to assign to model
     properties={                                                # Dictionary of key value properties to assign to model, properties cannot be changed after model creation
-        'AUC': pipeline_run.get_metrics()['AUC'],
-        'Accuracy': pipeline_run.get_metrics()['Accuracy']
+        'AUC': pipeline_metrics['AUC'],
+        'Accuracy': pipeline_metrics['Accuracy']
     }
 )
 
-# List registered models - training concept of latest model should be 'pipeline'
-for model in Model.list(ws):                                    # Retrieve a list of all models associated with the provided workspace, with optional filters 
-    print(model.name, 'version:', model.version)
-    for tag_name in model.tags:
-        tag = model.tags[tag_name]
-        print ('\t',tag_name, ':', tag)
-    for prop_name in model.properties:
-        prop = model.properties[prop_name]
-        print ('\t',prop_name, ':', prop)
-    print('\n')
+# List latest registered model - training concept of latest model should be 'pipeline'
+models = Model.list(                                            # Retrieve a list of all models associated with the provided workspace, with optional filters 
+    ws,                                                         # Workspace object from which to retrieve models
+    name='diabetes_model',                                      # Only return models with the given name, filtered by the service
+    latest=True                                                 # Only return the latest version of the model
+)
+model_lines = []
+for model in models:
+    model_lines.append(f'{model.name} version: {model.version}')
+    model_lines.extend(f'\t {tag_name} : {tag}' for tag_name, tag in model.tags.items())
+    model_lines.extend(f'\t {prop_name} : {prop}' for prop_name, prop in model.properties.items())
+print('\n'.join(model_lines))
 
 #-----ENDPOINT-----------------------------------------------------------------#
 '''
@@ -201,7 +370,7 @@ Endpoint for model training calls
 * To use an endpoint, client applications need to make a REST call over HTTP
 * Request must be authenticated --> authorization header is required
 * Real application would require a service principal with which to be authenticated
-* For now, use the authorization header from the current connection to Azure workspace
+* Without service principal credentials, use the authorization header from the current connection to Azure workspace
 '''
 # Publish the pipeline from the run as a REST service
 published_pipeline = pipeline_run.publish_pipeline(             # Publish a pipeline and make it available for rerunning
@@ -214,30 +383,58 @@ published_pipeline = pipeline_run.publish_pipeline(             # Publish a pipe
 rest_endpoint = published_pipeline.endpoint                     # REST endpoint URL to submit runs for this pipeline
 print(rest_endpoint)
 
-# Define authentication header
-interactive_auth = InteractiveLoginAuthentication()             # Manages authentication and acquires an authorization token in interactive login workflows
-auth_header = interactive_auth.get_authentication_header()      # Return the HTTP authorization header, authorization header contains the user access token for access authorization against the service
-print('Authentication header ready.')
+# Authentication header has been defined while waiting for the pipeline run, REST calls use the cached header (see above)
 
-# Make REST call to get pipeline run ID
-response = requests.post(
-    rest_endpoint, 
-    headers=auth_header, 
-    json={'ExperimentName': experiment_name}
+'''
+Submit multiple runs via the endpoint e.g. for different pipeline parameters
+* Each REST call and wait for completion is bound by network round-trips
+* Submit runs concurrently from a thread pool, each thread waits for its own run
+'''
+pipeline_requests = [                                           # JSON body per pipeline run, add 'ParameterAssignments' to set pipeline parameters
+    {'ExperimentName': experiment_name}
+]
+rest_max_workers = 64                                           # Maximum number of concurrent REST submissions
+
+# Reuse connections to the endpoint across REST calls instead of a new connection per call
+session = requests.Session()                                    # Persists connection pool and settings across requests
+session.mount(                                                  # Register transport adapter for all https URLs
+    'https://',
+    HTTPAdapter(                                                # Transport adapter with connection pooling
+        pool_connections=16,                                    # Number of host connection pools to cache
+        pool_maxsize=rest_max_workers,                          # Maximum number of connections per pool, one per concurrent submission
+        max_retries=Retry(                                      # Retry failed connections with exponential backoff
+            total=5,                                            # Maximum number of retries
+            backoff_factor=0.3,                                 # Backoff factor between retries
+            status_forcelist=[502, 503, 504]                    # Status codes to retry, only for idempotent methods i.e. submitting runs via POST is not repeated
+        )
+    )
 )
-run_id = response.json()['Id']
 
-# Use run ID to wait for pipeline to finish
-published_pipeline_run = PipelineRun(                           # Represents a run of a Pipeline
-    ws.experiments[experiment_name],                            # Experiment object associated with the pipeline run
-    run_id                                                      # Run ID of the pipeline run
-)
-published_pipeline_run.wait_for_completion()                    # Wait for the completion of this run, returns the status object after the wait
+def submit_pipeline_run(json_body):
+    # Make REST call to get pipeline run ID
+    response = session.post(
+        rest_endpoint, 
+        headers=get_auth_header(), 
+        json=json_body
+    )
+    run_id = response.json()['Id']
+
+    # Use run ID to wait for pipeline to finish
+    published_pipeline_run = PipelineRun(                       # Represents a run of a Pipeline
+        ws.experiments[experiment_name],                        # Experiment object associated with the pipeline run
+        run_id                                                  # Run ID of the pipeline run
+    )
+    return published_pipeline_run.wait_for_completion()         # Wait for the completion of this run, returns the status object after the wait
+
+with ThreadPoolExecutor(max_workers=rest_max_workers) as executor:
+    for json_body, status in zip(pipeline_requests, executor.map(submit_pipeline_run, pipeline_requests)):
+        print(json_body, ':', status)                           # Summarize the final status of each submitted run
 
 # Get details of latest run
 pipeline_experiment = ws.experiments.get(experiment_name)       # Get experiment by name of current workspace
-latest_run = list(pipeline_experiment.get_runs())[0]            # Return a generator of the runs for this experiment, in reverse chronological order
-latest_run.get_details()                                        # Get the definition, status information, current log files, and other details of the run
+latest_run = next(pipeline_experiment.get_runs(), None)          # Return a generator of the runs for this experiment, in reverse chronological order, only fetch the first
+if latest_run is not None:
+    latest_run.get_details()                                    # Get the definition, status information, current log files, and other details of the run
 
 #-----SCHEDULE-----------------------------------------------------------------#
 # Schedule pipeline e.g. for a weekly run
@@ -257,6 +454,28 @@ weekly_schedule = Schedule.create(                              # Create a sched
 )
 print('Pipeline scheduled.')
 
+# Schedule pipeline to run on data changes, weekly schedule remains as fallback
+'''
+Datastore trigger
+* Schedule polls the datastore and submits a run only if blobs were added or modified
+* No runs on unchanged data, new data is picked up within the polling interval
+* Path of the added or modified blobs is passed to the input_data pipeline parameter
+    * Changed input path invalidates reuse, so the prep steps and the training step re-run
+    * Triggered run processes the data of the changed path
+'''
+datastore_schedule = Schedule.create(                           # Create a schedule for a pipeline
+    ws,                                                         # Workspace object this Schedule will belong to
+    name='on-new-data-diabetes-training',                       # Name of the schedule
+    description='Based on data changes',                        # Description of the schedule
+    pipeline_id=published_pipeline.id,                          # ID of the pipeline the schedule will submit
+    experiment_name='mslearn-diabetes-pipeline',                # Name of the experiment schedule will submit runs on
+    datastore=ws.get_default_datastore(),                       # Datastore to monitor for modified/added blobs (see ./01_datastores.py)
+    path_on_datastore='diabetes-data/',                         # Path on the datastore to monitor, location of the training data
+    data_path_parameter_name='input_data',                      # Name of the data path pipeline parameter to set with the changed blob path
+    polling_interval=30                                         # How long, in minutes, between polling for modified/added blobs
+)
+print('Pipeline scheduled on data changes.')
+
 # List schedules
 schedules = Schedule.list(ws)                                   # Get all schedules in the current workspace
 schedules
@@ -181,5 +181,6 @@ published_pipeline_run.wait_for_completion()                    # Wait for the c
 
 # Get details of latest run
 pipeline_experiment = ws.experiments.get(experiment_name)       # Get experiment by name of current workspace
-latest_run = list(pipeline_experiment.get_runs())[0]            # Return a generator of the runs for this experiment, in reverse chronological order
-latest_run.get_details()                                        # Get the definition, status information, current log files, and other details of the run
+latest_run = next(pipeline_experiment.get_runs(), None)          # Return a generator of the runs for this experiment, in reverse chronological order, only fetch the first
+if latest_run is not None:
+    latest_run.get_details()                                    # Get the definition, status information, current log files, and other details of the run
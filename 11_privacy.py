@@ -1,7 +1,9 @@
 # Import libraries
 from azureml.core import Workspace
 import matplotlib.pyplot as plt
+import numpy as np
 import opendp.smartnoise.core as sn
+import os
 import pandas as pd
 
 #-----WORKSPACE----------------------------------------------------------------#
@@ -11,7 +13,8 @@ print(ws.name, 'loaded')
 
 #-----DATASET------------------------------------------------------------------#
 # Get the training dataset from registered datasets (see ./01_datastores.py)
-data = ws.datasets.get('diabetes dataset')                      # Get specified dataset from list of all datasets in workspace
+diabetes_ds = ws.datasets.get('diabetes dataset')               # Get specified dataset from list of all datasets in workspace
+data = diabetes_ds.to_pandas_dataframe()                        # Load the tabular dataset once into a pandas DataFrame, reused by all analyses below
 
 #-----DIFFERENTIAL_PRIVACY-----------------------------------------------------#
 '''
@@ -34,14 +37,35 @@ opendb-smartnoise
         * Values should be between 0 and 1 generally
         * Correlated with another value delta: indicates the probability that a report generated by an analysis is not fully private
 '''
-# Creates an analysis and report mean Age value from differentially private data
-cols = list(data.columns)
-age_range = [0.0, 120.0]
-samples = len(data)
+'''
+Private source data
+* SmartNoise treats plain values passed to its components e.g. NumPy arrays as public literals
+* Load the source data as sn.Dataset instead, marking it as private (default public=False)
+* Noise is only added to statistics derived from private data
+'''
+private_data_path = os.path.join('private-data', 'diabetes.csv')
+os.makedirs(os.path.dirname(private_data_path), exist_ok=True)
+data.to_csv(private_data_path, index=False)                     # Local copy of the dataset for SmartNoise to read from
+cols = list(data.columns)                                       # Column names of the private dataset
+
+# Creates one analysis for all differentially private statistics, released once
+# Source columns are converted once and shared between the statistics
+age_range = (0.0, 120.0)                                        # Lower and upper bound of Age, immutable tuple
+bp_range = (0.0, 150.0)                                         # Lower and upper bound of DiastolicBloodPressure
+samples = len(data)                                             # Row count of the already loaded DataFrame
+age_np = data['Age'].to_numpy(dtype=np.float64)                 # Contiguous NumPy arrays of the source columns, reused for the actual (non-private) values
+bp_np = data['DiastolicBloodPressure'].to_numpy(dtype=np.float64)
+ages = np.arange(0, 130, 10)                                    # 10-year bin edges
 
 with sn.Analysis() as analysis:  
-    # Convert Age to float
-    age_dt = sn.to_float(data['Age'])
+    private_data = sn.Dataset(                                  # Private dataset read by SmartNoise
+        path = private_data_path,
+        column_names = cols
+    )
+
+    # Convert Age and blood pressure to float
+    age_dt = sn.to_float(private_data['Age'])
+    bp_dt = sn.to_float(private_data['DiastolicBloodPressure'])
     
     # Get mean of age
     age_mean = sn.dp_mean(
@@ -51,33 +75,44 @@ with sn.Analysis() as analysis:
         data_upper = age_range[1],
         data_rows = samples
     )
+
+    # Get histogram of age
+    age_histogram = sn.dp_histogram(
+            sn.to_int(private_data['Age'], lower=0, upper=120),
+            edges = ages.tolist(),
+            upper = 10000,
+            null_value = -1,
+            privacy_usage = {'epsilon': 0.5}
+        )
+
+    # Get covariance to establish relationships between variables
+    age_bp_cov_scalar = sn.dp_covariance(
+                left = age_dt,
+                right = bp_dt,
+                privacy_usage = {'epsilon': 1.0},
+                left_lower = age_range[0],
+                left_upper = age_range[1],
+                left_rows = samples,
+                right_lower = bp_range[0],
+                right_upper = bp_range[1],
+                right_rows = samples)
     
 analysis.release()
 
 #-----ANALYSIS-----------------------------------------------------------------#
-ages = list(range(0, 130, 10))
-age = data.Age
-
 # print differentially private estimate of mean age
 print("Private mean age:",age_mean.value)
 
 # print actual mean age
-print("Actual mean age:",data.Age.mean())
+actual_mean_age = np.nanmean(age_np)                            # Skip missing values, same as pandas
+print("Actual mean age:",actual_mean_age)
+print("Noise added to mean age:",age_mean.value - actual_mean_age) # Non-zero as the private estimate is computed from private data
 
 # Compare differentially private histogram of Age to original data
-with sn.Analysis() as analysis:
-    age_histogram = sn.dp_histogram(
-            sn.to_int(data['Age'], lower=0, upper=120),
-            edges = ages,
-            upper = 10000,
-            null_value = -1,
-            privacy_usage = {'epsilon': 0.5}
-        )
-    
-analysis.release()
-
 # Plot a histogram with 10-year bins of original data
-n_age, bins, patches = plt.hist(age, bins=ages, color='blue', alpha=0.7, rwidth=0.85)
+n_age, _ = np.histogram(age_np, bins=ages)                      # Count values per bin once, reused for both plots
+bin_starts = ages[:-1]                                          # Left edge of each bin, x-positions of the bars
+plt.bar(bin_starts + 5, n_age, width=8.5, color='blue', alpha=0.7) # Bars centered in their bin
 plt.grid(axis='y', alpha=0.75)
 plt.xlabel('Age')
 plt.ylabel('Frequency')
@@ -87,28 +122,43 @@ plt.show()
 # Plot a histogram with 10-year bins of original data and privatized data
 plt.ylim([0,7000])
 width=4
-agecat_left = [x + width for x in ages]
-agecat_right = [x + 2*width for x in ages]
-plt.bar(list(range(0,120,10)), n_age, width=width, color='blue', alpha=0.7, label='True')
-plt.bar(agecat_left, age_histogram.value, width=width, color='orange', alpha=0.7, label='Private')
+plt.bar(bin_starts, n_age, width=width, color='blue', alpha=0.7, label='True')
+plt.bar(bin_starts + width, age_histogram.value, width=width, color='orange', alpha=0.7, label='Private')
 plt.legend()
 plt.title('Histogram of Age')
 plt.xlabel('Age')
 plt.ylabel('Frequency')
 plt.show()
 
-# Differentially private covariance to establish relationships between variables
-with sn.Analysis() as analysis:
-    age_bp_cov_scalar = sn.dp_covariance(
-                left = sn.to_float(data['Age']),
-                right = sn.to_float(data['DiastolicBloodPressure']),
-                privacy_usage = {'epsilon': 1.0},
-                left_lower = 0.,
-                left_upper = 120.,
-                left_rows = 10000,
-                right_lower = 0.,
-                right_upper = 150.,
-                right_rows = 10000)
-analysis.release()
+# Compare differentially private covariance to original data
 print('Differentially private covariance: {0}'.format(age_bp_cov_scalar.value[0][0]))
-print('Actual covariance', data.Age.cov(data.DiastolicBloodPressure))
\ No newline at end of file
+valid_rows = ~np.isnan(age_np) & ~np.isnan(bp_np)               # Rows with both values present, same as pandas
+print('Actual covariance', np.cov(age_np[valid_rows], bp_np[valid_rows])[0, 1])
+
+#-----EPSILON_SWEEP------------------------------------------------------------#
+'''
+Privacy-utility tradeoff
+* Compare differentially private estimates for a range of epsilon values
+* Build all estimates in a single analysis, released once, instead of one analysis per epsilon
+* Privacy budget of the analysis is the sum of all epsilon values
+'''
+def dp_mean_sweep(data_path, column_names, column, bounds, rows, epsilons):
+    with sn.Analysis() as analysis:
+        private_data = sn.Dataset(path=data_path, column_names=column_names)    # Private dataset, same as above
+        values_dt = sn.to_float(private_data[column])           # Shared source node for all estimates
+        means = [
+            sn.dp_mean(
+                data = values_dt,
+                privacy_usage = {'epsilon': epsilon},
+                data_lower = bounds[0],
+                data_upper = bounds[1],
+                data_rows = rows
+            )
+            for epsilon in epsilons
+        ]
+    analysis.release()
+    return [mean.value for mean in means]
+
+epsilons = [0.05, 0.1, 0.25, 0.5, 1.0]
+for epsilon, private_mean in zip(epsilons, dp_mean_sweep(private_data_path, cols, 'Age', age_range, samples, epsilons)):
+    print(f'Private mean age (epsilon {epsilon}):', private_mean, '- actual:', actual_mean_age)
\ No newline at end of file
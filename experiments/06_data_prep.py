@@ -1,6 +1,7 @@
 # Import libraries
 import os
 import argparse
+import glob
 import pandas as pd
 from azureml.core import Run
 from sklearn.preprocessing import MinMaxScaler
@@ -18,10 +19,10 @@ parser = argparse.ArgumentParser()
 parser.add_argument(
     '--input-data',
     type=str,
-    dest='raw_dataset_id',
-    help='raw dataset'
+    dest='dataset_folder',
+    help='data download path'
 )
-# parser.add_argument('--input-data', type=str, dest='dataset_folder', help='data mount point') # Using file dataset
+# parser.add_argument('--input-data', type=str, dest='raw_dataset_id', help='raw dataset') # Using tabular dataset
 
 parser.add_argument(
     '--prepped-data',
@@ -30,45 +31,70 @@ parser.add_argument(
     default='prepped_data',
     help='Folder for results'
 )
+parser.add_argument(
+    '--prep-task',
+    type=str,
+    dest='prep_task',
+    choices=['features', 'labels', 'stats'],
+    default='features',
+    help='Part of the data preparation to run, each task is run as its own, independent pipeline step'
+)
 
 # Add arguments to args collection
 args = parser.parse_args()
 save_folder = args.prepped_data
+prep_task = args.prep_task
 
 #-----DATA---------------------------------------------------------------------#
-# load the data (passed as an input dataset)
+# load the data (passed as a data path, downloaded to local disk of the compute before the script starts)
 print('Loading Data...')
-diabetes = run.input_datasets['raw_data'].to_pandas_dataframe()
+data_path = args.dataset_folder # Get the training data path from the input, a folder or a single file e.g. a changed blob passed by a datastore trigger
+if os.path.isfile(data_path):
+    all_files = [data_path]
+else:
+    all_files = sorted(glob.glob(os.path.join(data_path, '**', '*.csv'), recursive=True)) # Read the files in a fixed order, same row order in every prep step
+diabetes = pd.concat((pd.read_csv(f) for f in all_files), sort=False, ignore_index=True) # Row index unique across files
 
-# Using file dataset instead of tabular data:
-    # data_path = run.input_datasets['training_files'] # Get the training data path from the input using a file dataset
-    # (You could also just use args.dataset_folder if you don't want to rely on a hard-coded friendly name)
-    # all_files = glob.glob(data_path + '/*.csv') # Read the files
-    # diabetes = pd.concat((pd.read_csv(f) for f in all_files), sort=False)
+# Using tabular dataset instead of file data:
+    # diabetes = run.input_datasets['raw_data'].to_pandas_dataframe()
 
-# Log raw row count
+# Raw row count
 row_count = (len(diabetes))
-run.log('raw_rows', row_count)
 
 #-----DATA_PREP----------------------------------------------------------------#
 # remove nulls
 diabetes = diabetes.dropna()
 
-# Normalize the numeric columns
-scaler = MinMaxScaler()
 num_cols = ['Pregnancies','PlasmaGlucose','DiastolicBloodPressure','TricepsThickness','SerumInsulin','BMI','DiabetesPedigree']
-diabetes[num_cols] = scaler.fit_transform(diabetes[num_cols])
+feature_cols = num_cols + ['Age']
 
-# Log processed rows
-row_count = (len(diabetes))
-run.log('processed_rows', row_count)
+if prep_task == 'features':
+    # Normalize the numeric columns
+    scaler = MinMaxScaler()
+    diabetes[num_cols] = scaler.fit_transform(diabetes[num_cols])
+    # Single precision is sufficient for normalized values, halves their data size
+    prepped = diabetes[feature_cols].astype({col: 'float32' for col in num_cols})
+elif prep_task == 'labels':
+    # Separate labels
+    prepped = diabetes[['Diabetic']]
+else:
+    # Log raw and processed row count
+    run.log('raw_rows', row_count)
+    run.log('processed_rows', len(diabetes))
+    # Summary statistics of the features
+    prepped = diabetes[feature_cols].describe()
 
 #-----SAVE---------------------------------------------------------------------#
 # Save the prepped data
 print('Saving Data...')
 os.makedirs(save_folder, exist_ok=True)
-save_path = os.path.join(save_folder,'data.csv')
-diabetes.to_csv(save_path, index=False, header=True)
+save_path = os.path.join(save_folder, prep_task + '.parquet')
+prepped.to_parquet(                                             # Columnar, compressed binary format, smaller and faster to read than csv
+    save_path,
+    engine='pyarrow',
+    compression='snappy',
+    index=True                                                  # Keep row index as key to join features and labels, statistic names for stats
+)
 
 # End the run
 run.complete()
\ No newline at end of file
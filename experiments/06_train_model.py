@@ -22,10 +22,22 @@ Experiment Parameter
 '''
 parser = argparse.ArgumentParser()
 parser.add_argument(
-    '--training-data',
+    '--training-features',
     type=str,
-    dest='training_data',
-    help='training data'
+    dest='training_features',
+    help='training features'
+)
+parser.add_argument(
+    '--training-labels',
+    type=str,
+    dest='training_labels',
+    help='training labels'
+)
+parser.add_argument(
+    '--data-stats',
+    type=str,
+    dest='data_stats',
+    help='summary statistics of training features'
 )
 parser.add_argument(
     '--regularization',
@@ -39,16 +51,24 @@ parser.add_argument(
 args = parser.parse_args()
 
 # Set training data from prepared data
-training_data = args.training_data
+training_features = args.training_features
+training_labels = args.training_labels
+data_stats = args.data_stats
 
 # Set regularization hyperparameter (passed as an argument to the script)
 reg = args.reg_rate
 
 #-----DATA---------------------------------------------------------------------#
-# load the prepared data file in the training folder
+# load the prepared data files in the training folders
 print('Loading Data...')
-file_path = os.path.join(training_data,'data.csv')
-diabetes = pd.read_csv(file_path)
+features = pd.read_parquet(os.path.join(training_features,'features.parquet'), engine='pyarrow')
+labels = pd.read_parquet(os.path.join(training_labels,'labels.parquet'), engine='pyarrow')
+stats = pd.read_parquet(os.path.join(data_stats,'stats.parquet'), engine='pyarrow')
+print('Feature statistics:\n', stats)
+
+# Join features and labels on their row index, both are written by separate prep steps
+diabetes = features.join(labels, how='inner')
+assert len(diabetes) == len(features) == len(labels), 'Features and labels rows do not match'
 
 # Separate features and labels
 X, y = diabetes[['Pregnancies', 'PlasmaGlucose', 'DiastolicBloodPressure',